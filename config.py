@@ -1,12 +1,64 @@
 """Configuration for ServiceNow Documentation Vectorizer"""
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
 
+@lru_cache(maxsize=2)
+def _build_embedding_function(model_type: str, model_name: str, openai_api_key: Optional[str],
+                              quantize_int8: bool = False):
+    """Build an embedding function once per process.
+
+    Constructing HuggingFaceEmbeddings loads a SentenceTransformer from disk,
+    which takes seconds; caching on the configuration tuple means repeat
+    callers (index + query in one process, MCP server reinit) share one model.
+    """
+    if model_type.lower() == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        if not openai_api_key:
+            raise ValueError("OPENAI_API_KEY must be set when using OpenAI embeddings")
+        return OpenAIEmbeddings(
+            model=model_name,
+            openai_api_key=openai_api_key
+        )
+    else:
+        try:
+            from langchain_huggingface import HuggingFaceEmbeddings
+        except ImportError:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
+        import torch
+
+        # Use whatever accelerator is available rather than pinning to CPU;
+        # MiniLM encodes an order of magnitude faster on CUDA and several
+        # times faster on Apple Silicon MPS
+        if torch.cuda.is_available():
+            device = 'cuda'
+        elif torch.backends.mps.is_available():
+            device = 'mps'
+        else:
+            device = 'cpu'
+
+        if quantize_int8 and device == 'cpu':
+            try:
+                from onnx_embeddings import ONNXEmbeddings
+                return ONNXEmbeddings(model_name)
+            except ImportError:
+                # optimum/onnxruntime not installed; fall back to the
+                # float32 SentenceTransformer path below
+                pass
+
+        return HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={'device': device},
+            # batch_size keeps the device saturated during bulk indexing
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': 64}
+        )
+
+
 class Settings(BaseSettings):
     """Application settings with environment variable support"""
     
@@ -20,12 +72,20 @@ class Settings(BaseSettings):
     # Embedding Model Configuration
     embedding_model_type: str = Field(default="local", env="EMBEDDING_MODEL_TYPE")  # "openai" or "local"
     embedding_model_name: str = Field(default="all-MiniLM-L6-v2", env="EMBEDDING_MODEL_NAME")
+    # int8-quantized ONNX encoder for CPU-only hosts (requires optimum[onnxruntime])
+    embedding_quantize_int8: bool = Field(default=False, env="EMBEDDING_QUANTIZE_INT8")
     
     # Chunking Configuration
     chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
     chunk_overlap: int = Field(default=200, env="CHUNK_OVERLAP")
     separators: List[str] = Field(default=["\n\n", "\n", " ", ""], env="SEPARATORS")
     
+    # Remote services for async indexing (optional): a text-embeddings-
+    # inference style endpoint plus a Chroma server
+    embedding_server_url: Optional[str] = Field(default=None, env="EMBEDDING_SERVER_URL")
+    chroma_server_host: str = Field(default="localhost", env="CHROMA_SERVER_HOST")
+    chroma_server_port: int = Field(default=8000, env="CHROMA_SERVER_PORT")
+
     # MCP Server Configuration
     mcp_server_port: int = Field(default=3333, env="MCP_SERVER_PORT")
     mcp_server_host: str = Field(default="localhost", env="MCP_SERVER_HOST")
@@ -44,24 +104,12 @@ class Settings(BaseSettings):
 
     def get_embedding_function(self):
         """Get the appropriate embedding function based on configuration"""
-        if self.embedding_model_type.lower() == "openai":
-            from langchain_openai import OpenAIEmbeddings
-            if not self.openai_api_key:
-                raise ValueError("OPENAI_API_KEY must be set when using OpenAI embeddings")
-            return OpenAIEmbeddings(
-                model=self.embedding_model_name,
-                openai_api_key=self.openai_api_key
-            )
-        else:
-            try:
-                from langchain_huggingface import HuggingFaceEmbeddings
-            except ImportError:
-                from langchain_community.embeddings import HuggingFaceEmbeddings
-            return HuggingFaceEmbeddings(
-                model_name=self.embedding_model_name,
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
-            )
+        return _build_embedding_function(
+            self.embedding_model_type,
+            self.embedding_model_name,
+            self.openai_api_key,
+            self.embedding_quantize_int8
+        )
 
 
 # Create a global settings instance
@@ -1,16 +1,104 @@
 """Document processing utilities for markdown chunking and parsing"""
 
+import bisect
+import mmap
+import os
+import pickle
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
-import hashlib
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter, MarkdownHeaderTextSplitter
-from langchain.schema import Document
+import blake3
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from tqdm import tqdm
 import tiktoken
 
+# Matches runs of non-whitespace; counting matches avoids materializing the
+# list of substrings that str.split() would allocate per chunk
+_WORD_RE = re.compile(r"\S+")
+
+# ATX headers up to level 4, matched in one multiline pass over the buffer
+_HEADER_RE = re.compile(r"^(#{1,4}) +(.+)$", re.M)
+
+# Fenced code block delimiters; lines between a pair of fences must not be
+# mistaken for headers (e.g. shell/Python comments starting with #)
+_FENCE_RE = re.compile(r"^```", re.M)
+
+
+def _split_by_headers(content: str) -> List[Dict[str, Any]]:
+    """Split markdown into header-delimited sections with one regex pass.
+
+    Equivalent to MarkdownHeaderTextSplitter with headers kept in the content,
+    but a single compiled finditer over the whole buffer instead of a per-line
+    Python loop — much faster on multi-MB documents. Header matches inside
+    ``` fences are ignored, like MarkdownHeaderTextSplitter's fence tracking.
+    Sections are plain dicts ({"page_content", "metadata"}) to avoid
+    per-section model validation.
+    """
+    fence_positions = [m.start() for m in _FENCE_RE.finditer(content)]
+    matches = [
+        match for match in _HEADER_RE.finditer(content)
+        # An odd number of fences before the match puts it inside a code
+        # block (an unclosed final fence runs to end of document)
+        if not bisect.bisect_right(fence_positions, match.start()) % 2
+    ]
+    if not matches:
+        stripped = content.strip()
+        return [{"page_content": stripped, "metadata": {}}] if stripped else []
+
+    sections = []
+
+    # Anything before the first header has no header context
+    preamble = content[:matches[0].start()].strip()
+    if preamble:
+        sections.append({"page_content": preamble, "metadata": {}})
+
+    active_headers: Dict[str, str] = {}
+    for i, match in enumerate(matches):
+        level = len(match.group(1))
+        # Entering a header closes any deeper or same-level sections
+        active_headers = {
+            key: value for key, value in active_headers.items()
+            if int(key.rsplit(" ", 1)[1]) < level
+        }
+        active_headers[f"Header {level}"] = match.group(2).strip()
+
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+        body = content[match.start():end].strip()
+        if body:
+            sections.append({"page_content": body, "metadata": dict(active_headers)})
+
+    return sections
+
+
+@lru_cache(maxsize=4)
+def _get_encoding(name: str) -> "tiktoken.Encoding":
+    """Load a tiktoken encoding once per process.
+
+    tiktoken.get_encoding reads the BPE vocab from disk (set TIKTOKEN_CACHE_DIR
+    to control where), so the encoding is cached at module level and shared by
+    every DocumentProcessor instance.
+    """
+    return tiktoken.get_encoding(name)
+
+
+def _chunk_one(args) -> List[Dict[str, Any]]:
+    """Chunk a single file inside a worker process.
+
+    Takes a (path, chunk_size, chunk_overlap, cache_dir) tuple so only small
+    picklable values cross the process boundary; the processor is rebuilt in
+    the worker.
+    """
+    path_str, chunk_size, chunk_overlap, cache_dir = args
+    processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                  cache_dir=Path(cache_dir))
+    return processor.chunk_markdown(Path(path_str))
+
 
 @dataclass
 class ChunkMetadata:
@@ -29,39 +117,125 @@ class ChunkMetadata:
 class DocumentProcessor:
     """Process and chunk markdown documents for vectorization"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 cache_dir: Optional[Path] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.tokenizer = None
-        
+        self.cache_dir = Path(cache_dir) if cache_dir else Path(".chunk_cache")
+
+        # The splitter constructor pre-compiles its separator table, so build
+        # it once here instead of per file/section. No overlap at this stage:
+        # overlapping segments would duplicate text at every internal seam
+        # when the merge pass concatenates them; overlap between final chunks
+        # is added explicitly after merging
+        self._fine_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=max(chunk_size // 4, 100),
+            chunk_overlap=0,
+            separators=["\n\n", "\n", ". ", " ", ""],
+            length_function=len,
+        )
+
     def count_tokens(self, text: str, model: str = "cl100k_base") -> int:
         """Count tokens in text using tiktoken"""
-        if self.tokenizer is None:
-            self.tokenizer = tiktoken.get_encoding(model)
-        return len(self.tokenizer.encode(text))
+        return len(_get_encoding(model).encode(text, disallowed_special=()))
+
+    def count_tokens_batch(self, texts: List[str], model: str = "cl100k_base") -> List[int]:
+        """Count tokens for many texts at once.
+
+        encode_batch releases the GIL and tokenizes across threads, which is
+        much faster than calling count_tokens per chunk.
+        """
+        encoded = _get_encoding(model).encode_batch(
+            texts, num_threads=os.cpu_count() or 1, disallowed_special=()
+        )
+        return [len(tokens) for tokens in encoded]
     
     def generate_chunk_id(self, content: str, metadata: Dict[str, Any]) -> str:
         """Generate a unique ID for a chunk based on content and metadata"""
         hash_input = f"{content}{metadata.get('source', '')}{metadata.get('chunk_index', '')}"
-        return hashlib.md5(hash_input.encode()).hexdigest()
+        # BLAKE3 is SIMD-accelerated and much faster than MD5 on long inputs;
+        # length=16 keeps the familiar 32-hex-char ID width
+        return blake3.blake3(hash_input.encode()).hexdigest(length=16)
     
-    def extract_headers_from_markdown(self, content: str) -> List[Document]:
+    def extract_headers_from_markdown(self, content: str) -> List[Dict[str, Any]]:
         """Extract headers and structure from markdown content"""
-        headers_to_split_on = [
-            ("#", "Header 1"),
-            ("##", "Header 2"),
-            ("###", "Header 3"),
-            ("####", "Header 4"),
-        ]
-        
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=headers_to_split_on,
-            strip_headers=False
-        )
-        
-        return markdown_splitter.split_text(content)
+        return _split_by_headers(content)
+
+    def _split_then_merge(self, text: str, chunk_size: int) -> List[str]:
+        """Split text finely, then greedily merge neighbors back under chunk_size.
+
+        A single recursive-splitter pass leaves tiny, context-poor chunks near
+        section boundaries. Splitting at a small floor size and merging
+        adjacent segments while they still fit produces fewer, denser chunks —
+        and therefore fewer embeddings to compute and store.
+        """
+        segments = self._fine_splitter.split_text(text)
+        if not segments:
+            return []
+
+        # First pass: greedily concatenate neighbors while the pair fits
+        merged = [segments[0]]
+        for segment in segments[1:]:
+            if len(merged[-1]) + len(segment) < chunk_size:
+                merged[-1] = f"{merged[-1]}\n{segment}"
+            else:
+                merged.append(segment)
+
+        # Second pass: fold any leftover tiny chunk into a neighbor so it
+        # does not waste a retrieval slot
+        min_chunk_size = 100
+        if len(merged) > 1 and len(merged[0]) < min_chunk_size:
+            merged[1] = f"{merged[0]}\n{merged[1]}"
+            merged.pop(0)
+        result = [merged[0]]
+        for segment in merged[1:]:
+            if len(segment) < min_chunk_size:
+                result[-1] = f"{result[-1]}\n{segment}"
+            else:
+                result.append(segment)
+
+        # Re-introduce the configured overlap between final chunks now that
+        # merging is done, prefixing each chunk with the tail of its
+        # predecessor (aligned to a word boundary). Doing it here keeps the
+        # duplication at chunk boundaries only, never inside a chunk
+        if self.chunk_overlap and len(result) > 1:
+            with_overlap = [result[0]]
+            for prev, current in zip(result, result[1:]):
+                tail = prev[-self.chunk_overlap:]
+                boundary = tail.find(" ")
+                if 0 <= boundary < len(tail) - 1:
+                    tail = tail[boundary + 1:]
+                with_overlap.append(f"{tail}\n{current}")
+            return with_overlap
+
+        return result
+
+    def _make_chunk(self, text: str, chunk_index: int, section_index: int,
+                    subsection_index: int, headers: Dict[str, str], source: str,
+                    total_sections: int) -> Dict[str, Any]:
+        """Build one chunk dict with its metadata and content-hash ID.
+
+        Chunks stay plain dicts through the pipeline; constructing a pydantic
+        Document per chunk triggers field validation that dominates chunking
+        time on large documents.
+        """
+        metadata = {
+            "source": source,
+            "chunk_index": chunk_index,
+            "section_index": section_index,
+            "subsection_index": subsection_index,
+            "total_sections": total_sections,
+            "headers": headers,
+            # Pre-joined header path so query-time display is one string read
+            # instead of a parse + sort + join per result
+            "section_path": " > ".join(v for _, v in sorted(headers.items()) if v and v.strip()),
+            "word_count": sum(1 for _ in _WORD_RE.finditer(text)),
+            "char_count": len(text),
+        }
+        metadata["chunk_id"] = self.generate_chunk_id(text, metadata)
+        return {"page_content": text, "metadata": metadata}
     
-    def chunk_markdown(self, file_path: Path) -> List[Document]:
+    def chunk_markdown(self, file_path: Path) -> List[Dict[str, Any]]:
         """
         Chunk a markdown file into smaller pieces while preserving structure
         
@@ -69,116 +243,135 @@ class DocumentProcessor:
             file_path: Path to the markdown file
             
         Returns:
-            List of Document objects with content and metadata
+            List of {"page_content", "metadata"} dicts
         """
-        # Read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
+        # Memory-map the file so the raw bytes are shared with the page cache
+        # instead of copied into the process before decoding. mmap rejects
+        # empty files, and zero bytes yield zero chunks anyway
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                print(f"Skipping {file_path.name}: empty file")
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                content_hash = blake3.blake3(mm).hexdigest()
+                content = mm[:].decode('utf-8', errors='replace')
+
+        # Re-indexing unchanged content can skip the splitters entirely; the
+        # cache key includes the chunking config so config changes invalidate
+        cache_file = self.cache_dir / f"{content_hash}-{self.chunk_size}-{self.chunk_overlap}.pkl"
+        if cache_file.exists():
+            with open(cache_file, 'rb') as f:
+                cached_chunks = pickle.load(f)
+            print(f"Loaded {len(cached_chunks)} cached chunks for {file_path.name}")
+            return cached_chunks
+
         print(f"Processing {file_path.name} ({len(content):,} characters)...")
         
         # First, split by headers to maintain document structure
         header_chunks = self.extract_headers_from_markdown(content)
-        
-        # Then, further split large sections using RecursiveCharacterTextSplitter
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            length_function=len,
-        )
-        
+
         all_chunks = []
         total_header_chunks = len(header_chunks)
-        
-        for idx, header_chunk in enumerate(tqdm(header_chunks, desc="Processing sections")):
+        src = str(file_path)
+
+
+        # Disable the bar entirely without a TTY (e.g. under the MCP server)
+        # and throttle refreshes so per-section overhead stays negligible
+        section_bar = tqdm(
+            header_chunks,
+            desc="Processing sections",
+            disable=not sys.stderr.isatty(),
+            mininterval=1.0,
+        )
+        for idx, header_chunk in enumerate(section_bar):
             # Get the headers from metadata
-            headers = header_chunk.metadata
-            
+            headers = header_chunk["metadata"]
+            section_text = header_chunk["page_content"]
+
             # If the section is still too large, split it further
-            if len(header_chunk.page_content) > self.chunk_size:
-                sub_chunks = text_splitter.split_text(header_chunk.page_content)
-                
-                for sub_idx, sub_chunk_text in enumerate(sub_chunks):
-                    # Create metadata for this chunk
-                    metadata = {
-                        "source": str(file_path),
-                        "chunk_index": len(all_chunks),
-                        "section_index": idx,
-                        "subsection_index": sub_idx,
-                        "total_sections": total_header_chunks,
-                        "headers": headers,
-                        "word_count": len(sub_chunk_text.split()),
-                        "char_count": len(sub_chunk_text),
-                    }
-                    
-                    # Generate unique chunk ID
-                    chunk_id = self.generate_chunk_id(sub_chunk_text, metadata)
-                    metadata["chunk_id"] = chunk_id
-                    
-                    # Count tokens if needed (optional, can be slow for large docs)
-                    # metadata["token_count"] = self.count_tokens(sub_chunk_text)
-                    
-                    doc = Document(
-                        page_content=sub_chunk_text,
-                        metadata=metadata
-                    )
-                    all_chunks.append(doc)
+            if len(section_text) > self.chunk_size:
+                sub_chunks = self._split_then_merge(section_text, self.chunk_size)
+                base_index = len(all_chunks)
+                all_chunks.extend(
+                    self._make_chunk(sub_chunk_text, base_index + sub_idx, idx, sub_idx,
+                                     headers, src, total_header_chunks)
+                    for sub_idx, sub_chunk_text in enumerate(sub_chunks)
+                )
             else:
                 # Use the section as-is
-                metadata = {
-                    "source": str(file_path),
-                    "chunk_index": len(all_chunks),
-                    "section_index": idx,
-                    "subsection_index": 0,
-                    "total_sections": total_header_chunks,
-                    "headers": headers,
-                    "word_count": len(header_chunk.page_content.split()),
-                    "char_count": len(header_chunk.page_content),
-                }
-                
-                chunk_id = self.generate_chunk_id(header_chunk.page_content, metadata)
-                metadata["chunk_id"] = chunk_id
-                
-                doc = Document(
-                    page_content=header_chunk.page_content,
-                    metadata=metadata
+                all_chunks.append(
+                    self._make_chunk(section_text, len(all_chunks), idx, 0,
+                                     headers, src, total_header_chunks)
                 )
-                all_chunks.append(doc)
-        
+
+        # Count tokens for all chunks in one batched call rather than per chunk
+        if all_chunks:
+            token_counts = self.count_tokens_batch([chunk["page_content"] for chunk in all_chunks])
+            for chunk, token_count in zip(all_chunks, token_counts):
+                chunk["metadata"]["token_count"] = token_count
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'wb') as f:
+            pickle.dump(all_chunks, f)
+
         print(f"Created {len(all_chunks)} chunks from {total_header_chunks} sections")
         return all_chunks
     
-    def process_multiple_files(self, file_paths: List[Path]) -> List[Document]:
-        """Process multiple markdown files"""
-        all_documents = []
-        
+    def process_multiple_files(self, file_paths: List[Path]) -> List[Dict[str, Any]]:
+        """Process multiple markdown files in parallel across CPU cores"""
+        valid_paths = []
         for file_path in file_paths:
             if file_path.exists() and file_path.suffix == '.md':
-                documents = self.chunk_markdown(file_path)
-                all_documents.extend(documents)
-                print(f"Processed {file_path.name}: {len(documents)} chunks")
+                valid_paths.append(file_path)
             else:
                 print(f"Skipping {file_path}: not a valid markdown file")
-        
+
+        if not valid_paths:
+            return []
+
+        # Chunking is CPU-bound (header splitting, recursive splitting,
+        # hashing), so files are farmed out to a process pool
+        all_documents = []
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {
+                executor.submit(_chunk_one, (str(path), self.chunk_size, self.chunk_overlap,
+                                             str(self.cache_dir))): path
+                for path in valid_paths
+            }
+            for future in as_completed(futures):
+                file_path = futures[future]
+                documents = future.result()
+                all_documents.extend(documents)
+                print(f"Processed {file_path.name}: {len(documents)} chunks")
+
         return all_documents
     
-    def get_chunk_statistics(self, chunks: List[Document]) -> Dict[str, Any]:
+    def get_chunk_statistics(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Get statistics about the processed chunks"""
         if not chunks:
             return {}
         
-        char_counts = [chunk.metadata.get("char_count", 0) for chunk in chunks]
-        word_counts = [chunk.metadata.get("word_count", 0) for chunk in chunks]
-        
+        # NumPy reductions run in C instead of looping the interpreter over
+        # every chunk for each of sum/min/max
+        char_counts = np.fromiter(
+            (chunk["metadata"].get("char_count", 0) for chunk in chunks),
+            dtype=np.int64,
+            count=len(chunks),
+        )
+        word_counts = np.fromiter(
+            (chunk["metadata"].get("word_count", 0) for chunk in chunks),
+            dtype=np.int64,
+            count=len(chunks),
+        )
+
         return {
             "total_chunks": len(chunks),
-            "avg_char_count": sum(char_counts) / len(char_counts),
-            "min_char_count": min(char_counts),
-            "max_char_count": max(char_counts),
-            "avg_word_count": sum(word_counts) / len(word_counts),
-            "min_word_count": min(word_counts),
-            "max_word_count": max(word_counts),
-            "total_characters": sum(char_counts),
-            "total_words": sum(word_counts),
+            "avg_char_count": float(char_counts.mean()),
+            "min_char_count": int(char_counts.min()),
+            "max_char_count": int(char_counts.max()),
+            "avg_word_count": float(word_counts.mean()),
+            "min_word_count": int(word_counts.min()),
+            "max_word_count": int(word_counts.max()),
+            "total_characters": int(char_counts.sum()),
+            "total_words": int(word_counts.sum()),
         }
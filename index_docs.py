@@ -3,10 +3,11 @@
 
 import click
 from pathlib import Path
-import json
 from datetime import datetime
 import sys
 
+import orjson
+
 from document_processor import DocumentProcessor
 from vector_store import VectorStoreManager
 from config import settings
@@ -101,7 +102,8 @@ def index_documentation(docs_path, chunk_size, chunk_overlap, reset, batch_size)
     print(f"   Using embedding model: {settings.embedding_model_type}/{settings.embedding_model_name}")
     print(f"   Batch size: {batch_size}")
     
-    indexing_stats = vector_store.add_documents(documents, batch_size=batch_size)
+    indexing_stats = vector_store.add_documents(documents, batch_size=batch_size,
+                                                total=len(documents))
     
     # Display results
     print("\n5. Indexing Complete!")
@@ -129,8 +131,11 @@ def index_documentation(docs_path, chunk_size, chunk_overlap, reset, batch_size)
         }
     }
     
-    with open(summary_file, 'w') as f:
-        json.dump(summary, f, indent=2)
+    # orjson writes UTF-8 bytes directly and serializes NumPy scalars from the
+    # chunking stats without a Python-level default hook
+    summary_file.write_bytes(
+        orjson.dumps(summary, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    )
     
     print(f"\nSummary saved to: {summary_file}")
     
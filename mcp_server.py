@@ -25,19 +25,23 @@ except Exception as e:
     VECTOR_STORE_AVAILABLE = False
 
 
+def _truncate(text: str, width: int) -> str:
+    """Truncate to width at a word boundary, preserving line structure."""
+    if len(text) <= width:
+        return text
+    cut = max(text.rfind(" ", 0, width), text.rfind("\n", 0, width))
+    return text[:cut if cut > 0 else width] + "..."
+
+
 class FixedServiceNowServer:
     def __init__(self):
         self.vector_store = None
         
     async def search_docs(self, query: str, max_results: int = 5):
         """Search ServiceNow documentation"""
-        if not VECTOR_STORE_AVAILABLE:
+        if not VECTOR_STORE_AVAILABLE or self.vector_store is None:
             return "Vector store not available"
-            
-        if self.vector_store is None:
-            # This will now initialize with telemetry disabled
-            self.vector_store = VectorStoreManager()
-            
+
         results = self.vector_store.search_with_relevance(
             query=query,
             k=max_results,
@@ -50,23 +54,23 @@ class FixedServiceNowServer:
         response_parts = [f"ServiceNow Search Results for: '{query}'\n"]
         
         for i, result in enumerate(results, 1):
-            headers = result.get("headers", {})
-            if isinstance(headers, str):
-                try:
-                    headers = json.loads(headers)
-                except:
-                    headers = {}
-                    
-            section = ""
-            if headers:
-                section_parts = [v for k, v in sorted(headers.items()) if v and v.strip()]
-                if section_parts:
-                    section = f"Section: {' > '.join(section_parts)}\n"
+            # Chunks indexed since the section_path metadata was added carry a
+            # pre-joined header path; fall back to parsing for older chunks
+            section_path = result.get("section_path", "")
+            if not section_path:
+                headers = result.get("headers", {})
+                if isinstance(headers, str):
+                    try:
+                        headers = json.loads(headers)
+                    except:
+                        headers = {}
+                if headers:
+                    section_path = ' > '.join(v for k, v in sorted(headers.items()) if v and v.strip())
+
+            section = f"Section: {section_path}\n" if section_path else ""
                     
-            content = result['content']
-            if len(content) > 300:
-                content = content[:300] + "..."
-                
+            content = _truncate(result['content'], 300)
+
             response_parts.append(f"## Result {i} (Score: {result['score']:.3f})\n{section}{content}\n")
             
         return "\n".join(response_parts)
@@ -125,9 +129,7 @@ async def main():
             return [TextContent(type="text", text=result)]
             
         elif name == "get_servicenow_status":
-            if VECTOR_STORE_AVAILABLE:
-                if servicenow.vector_store is None:
-                    servicenow.vector_store = VectorStoreManager()
+            if VECTOR_STORE_AVAILABLE and servicenow.vector_store is not None:
                 info = servicenow.vector_store.get_collection_info()
                 status = f"ServiceNow Documentation System\nStatus: Active\nDocuments: {info.get('count', 0):,}\nCollection: {info.get('name', 'Unknown')}"
             else:
@@ -145,6 +147,10 @@ async def main():
             servicenow.vector_store = VectorStoreManager()
             info = servicenow.vector_store.get_collection_info()
             print(f"Loaded {info.get('count', 0)} documents", file=sys.stderr)
+            # Warm-up query so the SentenceTransformer and HNSW caches are
+            # loaded now instead of blocking the first user request
+            servicenow.vector_store.search_with_relevance("warmup", k=1)
+            print("Vector store warmed up", file=sys.stderr)
         except Exception as e:
             print(f"Warning: Vector store init failed: {e}", file=sys.stderr)
     
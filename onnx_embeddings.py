@@ -0,0 +1,60 @@
+"""int8-quantized ONNX embeddings for CPU-only deployments"""
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+
+class ONNXEmbeddings:
+    """Embeddings backed by an int8-quantized ONNX export of the model.
+
+    On CPU-only hosts the encoder is memory-bandwidth bound; dynamic int8
+    quantization halves the weight bytes moved per forward pass and lets
+    onnxruntime use VNNI int8 kernels, roughly doubling encode throughput
+    with minimal recall loss. Exposes the embed_documents / embed_query
+    interface that LangChain and Chroma expect.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = "./onnx_models"):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        model_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        quantized_dir = Path(cache_dir) / f"{model_name.replace('/', '__')}-int8"
+
+        # Export + quantize once; subsequent runs load the saved artifact
+        if not (quantized_dir / "model_quantized.onnx").exists():
+            model = ORTModelForFeatureExtraction.from_pretrained(
+                model_id, export=True, provider="CPUExecutionProvider"
+            )
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=str(quantized_dir),
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False),
+            )
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            str(quantized_dir),
+            provider="CPUExecutionProvider",
+            file_name="model_quantized.onnx",
+        )
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors="np")
+        outputs = self.model(**inputs)
+        hidden = outputs.last_hidden_state
+        mask = inputs["attention_mask"][..., np.newaxis]
+
+        # Mean-pool over valid tokens and L2-normalize, matching what the
+        # SentenceTransformer checkpoint does
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0].tolist()
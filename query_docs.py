@@ -2,17 +2,25 @@
 """Query the ServiceNow documentation vector store"""
 
 import click
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
-from rich.syntax import Syntax
-from rich import print as rprint
 import json
+import sys
 
 from vector_store import VectorStoreManager
 from config import settings
 
-console = Console()
+# Rich is imported lazily: pulling in rich.console/table/panel costs a few
+# hundred ms of CLI startup that JSON-mode (scripted/piped) invocations never
+# need
+console = None
+
+
+def _console():
+    """Build the shared Rich console on first use."""
+    global console
+    if console is None:
+        from rich.console import Console
+        console = Console()
+    return console
 
 
 @click.command()
@@ -53,18 +61,24 @@ def query_documentation(query, interactive, max_results, threshold, show_metadat
         info = vector_store.get_collection_info()
         
         if not json_output:
+            console = _console()
             console.print(f"[green]✓[/green] Connected to vector store")
             console.print(f"  Collection: {info['name']}")
             console.print(f"  Documents: {info['count']}")
             console.print()
         
     except Exception as e:
+        if json_output:
+            print(f"Failed to connect to vector store: {e}", file=sys.stderr)
+            return
+        console = _console()
         console.print(f"[red]✗[/red] Failed to connect to vector store: {e}")
         console.print("[yellow]Run 'python index_docs.py' first to index the documentation[/yellow]")
         return
     
     # Interactive mode
     if interactive:
+        console = _console()
         console.print("[bold cyan]ServiceNow Documentation Query Tool[/bold cyan]")
         console.print("Type 'quit' or 'exit' to stop, 'help' for commands\n")
         
@@ -112,11 +126,20 @@ def query_documentation(query, interactive, max_results, threshold, show_metadat
         )
     
     else:
+        console = _console()
         console.print("[yellow]Please provide a query or use --interactive mode[/yellow]")
         console.print("Usage: python query_docs.py 'your query here'")
         console.print("   or: python query_docs.py --interactive")
 
 
+def _truncate(text: str, width: int) -> str:
+    """Cut text to width on a word boundary without touching its newlines."""
+    if len(text) <= width:
+        return text
+    cut = max(text.rfind(" ", 0, width), text.rfind("\n", 0, width))
+    return text[:cut if cut > 0 else width] + "..."
+
+
 def perform_search(vector_store, query, max_results, threshold, show_metadata, json_output=False):
     """Perform a search and display results"""
     
@@ -128,7 +151,7 @@ def perform_search(vector_store, query, max_results, threshold, show_metadata, j
     )
     
     if json_output:
-        # JSON output mode
+        # JSON output mode: plain stdout, no Rich involved
         output = {
             "query": query,
             "results_count": len(results),
@@ -136,7 +159,11 @@ def perform_search(vector_store, query, max_results, threshold, show_metadata, j
         }
         print(json.dumps(output, indent=2))
         return
-    
+
+    from rich.panel import Panel
+    from rich.table import Table
+    console = _console()
+
     # Display results
     if not results:
         console.print(f"[yellow]No results found for: '{query}'[/yellow]")
@@ -146,17 +173,18 @@ def perform_search(vector_store, query, max_results, threshold, show_metadata, j
     console.print(f"\n[bold cyan]Found {len(results)} results for: '{query}'[/bold cyan]\n")
     
     for i, result in enumerate(results, 1):
-        # Create result panel
-        headers = result.get('headers', {})
-        if isinstance(headers, dict):
-            headers_str = ' > '.join([v for k, v in sorted(headers.items())]) if headers else "No headers"
-        else:
-            headers_str = str(headers) if headers else "No headers"
+        # Create result panel; prefer the pre-joined section path and fall
+        # back to joining headers for chunks indexed before it existed
+        headers_str = result.get('section_path', '')
+        if not headers_str:
+            headers = result.get('headers', {})
+            if isinstance(headers, dict):
+                headers_str = ' > '.join([v for k, v in sorted(headers.items())]) if headers else "No headers"
+            else:
+                headers_str = str(headers) if headers else "No headers"
         
         # Truncate content for display
-        content = result['content']
-        if len(content) > 500:
-            content = content[:500] + "..."
+        content = _truncate(result['content'], 500)
         
         # Create panel content
         panel_content = f"[bold]Score:[/bold] {result['score']:.3f}\n"
@@ -186,6 +214,7 @@ def perform_search(vector_store, query, max_results, threshold, show_metadata, j
 
 def show_help():
     """Show help information"""
+    from rich.panel import Panel
     help_text = """
 [bold cyan]Available Commands:[/bold cyan]
   
@@ -204,11 +233,12 @@ def show_help():
   - "AI agents setup"
   - "Knowledge Graph API"
     """
-    console.print(Panel(help_text, title="Help", border_style="blue"))
+    _console().print(Panel(help_text, title="Help", border_style="blue"))
 
 
 def show_config():
     """Show current configuration"""
+    from rich.table import Table
     config_table = Table(title="Current Configuration", show_header=True)
     config_table.add_column("Setting", style="cyan")
     config_table.add_column("Value", style="white")
@@ -221,7 +251,7 @@ def show_config():
     config_table.add_row("Max Results", str(settings.max_results))
     config_table.add_row("Similarity Threshold", str(settings.similarity_threshold))
     
-    console.print(config_table)
+    _console().print(config_table)
 
 
 if __name__ == "__main__":
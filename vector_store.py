@@ -1,33 +1,164 @@
 # vector_store.py
 
-"""Vector store management using ChromaDB and LangChain"""
+"""Vector store management using ChromaDB"""
 
-import json
+import asyncio
+import hashlib
+import os
+import sqlite3
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Iterable, List, Dict, Any, Optional
 
 import chromadb
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
 from chromadb.config import Settings as ChromaSettings
-from langchain_chroma import Chroma
-from langchain.schema import Document
 from tqdm import tqdm
 
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
 # Assuming config.py is in the same directory and contains 'settings'
 from config import settings
 
+# Semantic query cache sizing: a few hundred float32 query vectors is a few
+# hundred KB, so the scan stays cheap and memory stays bounded
+_QUERY_CACHE_SIZE = 256
+# Initial cosine-distance radius within which a cached query is considered
+# equivalent; adapted per entry as hits are observed
+_QUERY_CACHE_INIT_THRESHOLD = 0.05
+
+# Centroid cache: queries whose cosine similarity to a centroid is at or
+# above this are treated as the same intent and served the stored results
+_CENTROID_SIM_THRESHOLD = 0.86
+_CENTROID_MAX = 128
+
+
+def _cosine_sims(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine similarities of one query vector against a matrix of rows.
+
+    Routes through SimSIMD's AVX-512/NEON kernels when the package is
+    installed; otherwise falls back to a NumPy matrix-vector product (the
+    rows are L2-normalized, so the dot product already is the cosine).
+    """
+    if simsimd is not None:
+        dists = np.asarray(simsimd.cdist(query.reshape(1, -1), matrix, metric="cosine"))
+        return 1.0 - dists.ravel()
+    return matrix @ query
+
+
+def _quantize_embedding(vec: np.ndarray) -> np.ndarray:
+    """Quantizes a float32 embedding to int8.
+
+    No dequantization scale is kept: the cache compares vectors by cosine,
+    where per-vector scale factors cancel out.
+    """
+    max_abs = float(np.max(np.abs(vec))) or 1.0
+    return np.clip(np.round(vec * (127.0 / max_abs)), -127, 127).astype(np.int8)
+
+
+# Scalar types Chroma accepts as-is. Keyed on exact type() so the row-wise
+# fallback below is a single hash lookup per value instead of an isinstance
+# chain; subclasses fall through to str() coercion, which is what Chroma
+# would need anyway
+_ALLOWED_META_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _coerce_values(values: List[Any]) -> List[Any]:
+    """Row-wise fallback for columns pyarrow cannot type uniformly."""
+    return [v if type(v) in _ALLOWED_META_TYPES else str(v) for v in values]
+
+
+def _clean_metadatas(metadatas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Coerce metadata values to Chroma-compatible scalars, one column at a time.
+
+    Building a pyarrow array per key moves type checking to one C-level pass
+    per column instead of a Python isinstance call per value; anything that is
+    not a scalar type Chroma accepts gets cast (or str()-coerced) to string.
+    Mixed-type columns pyarrow rejects are cleaned value-by-value and kept as
+    plain Python columns, since a uniform Arrow type cannot hold them.
+    """
+    keys = set().union(*(metadata.keys() for metadata in metadatas))
+    columns = {}
+    python_columns = {}
+    for key in keys:
+        values = [metadata.get(key) for metadata in metadatas]
+        try:
+            arr = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            python_columns[key] = _coerce_values(values)
+            continue
+        if not (pa.types.is_string(arr.type) or pa.types.is_integer(arr.type)
+                or pa.types.is_floating(arr.type) or pa.types.is_boolean(arr.type)
+                or pa.types.is_null(arr.type)):
+            try:
+                arr = pc.cast(arr, pa.string(), safe=False)
+            except pa.ArrowNotImplementedError:
+                python_columns[key] = _coerce_values(values)
+                continue
+        columns[key] = arr
+    if columns:
+        rows = pa.Table.from_pydict(columns).to_pylist()
+    else:
+        rows = [{} for _ in metadatas]
+    for key, values in python_columns.items():
+        for row, value in zip(rows, values):
+            row[key] = value
+    # The key union fills missing cells with None, which Chroma rejects;
+    # drop entries the source metadata never had
+    for metadata, row in zip(metadatas, rows):
+        if len(row) != len(metadata):
+            for key in [k for k, v in row.items() if v is None and k not in metadata]:
+                del row[key]
+    return rows
+
+
 class VectorStoreManager:
     """Manage vector database operations for ServiceNow documentation."""
-    
-    def __init__(self, persist_directory: Optional[str] = None, collection_name: Optional[str] = None):
-        """Initializes the VectorStoreManager."""
+
+    def __init__(self, persist_directory: Optional[str] = None, collection_name: Optional[str] = None,
+                 hnsw_config: Optional[Dict[str, Any]] = None, expected_count: Optional[int] = None):
+        """Initializes the VectorStoreManager.
+
+        Args:
+            persist_directory: Where Chroma persists the collection.
+            collection_name: Collection to open or create.
+            hnsw_config: Optional "hnsw:*" metadata applied when the
+                collection is first created (e.g. "hnsw:construction_ef",
+                "hnsw:M" — higher values build a better graph at higher
+                insert cost). Ignored for existing collections.
+            expected_count: Estimated final document count; used to size the
+                HNSW write batches so the index grows in a few large steps
+                instead of many incremental reallocations.
+        """
         self.persist_directory = Path(persist_directory or settings.chroma_persist_directory)
         self.collection_name = collection_name or settings.collection_name
         self.embedding_function = settings.get_embedding_function()
         
         self.persist_directory.mkdir(parents=True, exist_ok=True)
-        
+
+        # WAL journaling cuts the per-transaction fsync cost of Chroma's many
+        # small SQLite writes during bulk indexing. journal_mode is the one
+        # pragma SQLite persists in the database file itself, so setting it on
+        # a throwaway connection before the client opens is enough; per-
+        # connection pragmas like synchronous would not survive this
+        # connection and are left at Chroma's defaults
+        try:
+            conn = sqlite3.connect(self.persist_directory / "chroma.sqlite3")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Could not set SQLite pragmas: {e}", file=sys.stderr)
+
+
         # This client configuration is correct and disables the problematic telemetry.
         # The package upgrade is the final part of the fix.
         self.client = chromadb.PersistentClient(
@@ -38,56 +169,327 @@ class VectorStoreManager:
             )
         )
         
-        # Initialize the LangChain Chroma vector store wrapper
-        self.vector_store = Chroma(
-            client=self.client,
-            collection_name=self.collection_name,
-            embedding_function=self.embedding_function,
-            persist_directory=str(self.persist_directory)
+        # Create the collection with its HNSW parameters in place from the
+        # first insert
+        collection_metadata = {"hnsw:space": "cosine"}
+        if hnsw_config:
+            collection_metadata.update(hnsw_config)
+        if expected_count:
+            collection_metadata.setdefault("hnsw:batch_size", max(1000, expected_count // 100))
+            collection_metadata.setdefault("hnsw:sync_threshold", max(2000, expected_count // 50))
+        self.collection = self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata=collection_metadata
         )
         
-        # Get the underlying collection object for direct operations like count()
-        self.collection = self.client.get_collection(name=self.collection_name)
-        
+        # Bounded FIFO semantic cache: repeated (or near-duplicate) queries are
+        # served from memory instead of re-running the HNSW search. Keys are
+        # one contiguous int8 matrix, a quarter the bytes of float32 and the
+        # layout SimSIMD's integer kernels scan without a copy
+        self._cache_keys: Optional[np.ndarray] = None
+        self._cache_entries: List[Dict[str, Any]] = []
+
+        # Centroid layer above the exact cache: popular intents collapse into
+        # incrementally-averaged centroids, so memory stays bounded no matter
+        # how many phrasings of the same question arrive
+        self._centroids: List[np.ndarray] = []
+        self._centroid_entries: List[Dict[str, Any]] = []
+
+        # Count once and track locally; collection.count() is a SQLite
+        # COUNT(*) behind the Rust boundary on every call
+        self._count = self.collection.count()
+
+        # IDs already in the collection, loaded once so duplicate chunks can
+        # be skipped before paying for their embeddings
+        self._known_ids = set(self.collection.get(include=[])["ids"])
+
         print(f"Vector store initialized for collection: '{self.collection_name}'", file=sys.stderr)
-        print(f"Current document count: {self.collection.count()}", file=sys.stderr)
+        print(f"Current document count: {self._count}", file=sys.stderr)
 
-    def add_documents(self, documents: List[Document], batch_size: int = 100) -> Dict[str, Any]:
-        """Adds documents to the vector store in batches."""
-        if not documents:
-            return {"error": "No documents provided"}
-        
-        stats = {"total_documents": len(documents), "successful": 0, "failed": 0, "start_time": datetime.now().isoformat()}
-        
-        for i in tqdm(range(0, len(documents), batch_size), desc="Indexing batches"):
-            batch = documents[i:i + batch_size]
+    def refresh_count(self) -> int:
+        """Re-reads the document count from Chroma, recovering from any drift."""
+        self._count = self.collection.count()
+        return self._count
+
+    def _query_cache_lookup(self, query_embedding: np.ndarray, k: int,
+                            distance_threshold: float) -> Optional[List[Dict[str, Any]]]:
+        """Returns cached results when a semantically close query was seen."""
+        if self._cache_keys is None:
+            return None
+
+        # Cosine distance over the int8 keys; quantization scales cancel in
+        # cosine, so the contiguous matrix feeds SimSIMD's int8 kernels
+        # directly, with a NumPy fallback when it is not installed
+        query_i8 = _quantize_embedding(query_embedding)
+        if simsimd is not None:
+            dists = np.asarray(
+                simsimd.cdist(query_i8.reshape(1, -1), self._cache_keys, metric="cosine")
+            ).ravel()
+        else:
+            dots = self._cache_keys.astype(np.int32) @ query_i8.astype(np.int32)
+            norms = np.linalg.norm(self._cache_keys.astype(np.float32), axis=1)
+            query_norm = float(np.linalg.norm(query_i8.astype(np.float32))) or 1.0
+            dists = 1.0 - dots / (norms * query_norm)
+        best = int(np.argmin(dists))
+        entry = self._cache_entries[best]
+        if entry["k"] != k or entry["distance_threshold"] != distance_threshold:
+            return None
+        dist = max(float(dists[best]), 1e-3)
+        hit = dist <= entry["region_threshold"]
+        # Adapt the region radius with an EMA over hits *and* near-misses:
+        # close hits tighten it, queries landing just outside widen it, so
+        # the region tracks the local query density instead of collapsing
+        # monotonically toward the floor
+        if hit or dist <= 2.0 * entry["region_threshold"]:
+            entry["region_threshold"] = 0.9 * entry["region_threshold"] + 0.1 * dist
+        return entry["results"] if hit else None
+
+    def _query_cache_insert(self, query_embedding: np.ndarray, k: int,
+                            distance_threshold: float, results: List[Dict[str, Any]]):
+        """Stores results for a query embedding, evicting oldest first."""
+        key_row = _quantize_embedding(query_embedding)[np.newaxis, :]
+        if self._cache_keys is None:
+            self._cache_keys = key_row
+        elif len(self._cache_entries) >= _QUERY_CACHE_SIZE:
+            # Drop the oldest row while keeping the key matrix contiguous
+            self._cache_keys = np.vstack((self._cache_keys[1:], key_row))
+            self._cache_entries.pop(0)
+        else:
+            self._cache_keys = np.vstack((self._cache_keys, key_row))
+        self._cache_entries.append({
+            "results": results,
+            "k": k,
+            "distance_threshold": distance_threshold,
+            "region_threshold": _QUERY_CACHE_INIT_THRESHOLD,
+        })
+
+    def _centroid_lookup(self, query_embedding: np.ndarray, k: int,
+                         distance_threshold: float) -> Optional[List[Dict[str, Any]]]:
+        """Returns stored results when the query lands on a known centroid."""
+        if not self._centroids:
+            return None
+
+        sims = _cosine_sims(query_embedding, np.vstack(self._centroids))
+        best = int(np.argmax(sims))
+        entry = self._centroid_entries[best]
+        if (sims[best] >= _CENTROID_SIM_THRESHOLD
+                and entry["k"] == k
+                and entry["distance_threshold"] == distance_threshold):
+            return entry["results"]
+        return None
+
+    def _centroid_update(self, query_embedding: np.ndarray, k: int,
+                         distance_threshold: float, results: List[Dict[str, Any]]):
+        """Folds a query into its nearest centroid, or opens a new one."""
+        if self._centroids:
+            sims = _cosine_sims(query_embedding, np.vstack(self._centroids))
+            best = int(np.argmax(sims))
+            entry = self._centroid_entries[best]
+            if (sims[best] >= _CENTROID_SIM_THRESHOLD
+                    and entry["k"] == k
+                    and entry["distance_threshold"] == distance_threshold):
+                # Incremental mean, re-normalized so dot products stay cosines
+                members = entry["members"]
+                centroid = (self._centroids[best] * members + query_embedding) / (members + 1)
+                self._centroids[best] = centroid / np.linalg.norm(centroid)
+                entry["members"] = members + 1
+                entry["results"] = results
+                return
+
+        # Prune the least-popular centroid once the budget is reached
+        if len(self._centroids) >= _CENTROID_MAX:
+            drop = min(range(len(self._centroid_entries)),
+                       key=lambda i: self._centroid_entries[i]["members"])
+            self._centroids.pop(drop)
+            self._centroid_entries.pop(drop)
+
+        norm = float(np.linalg.norm(query_embedding)) or 1.0
+        self._centroids.append(query_embedding / norm)
+        self._centroid_entries.append({
+            "results": results,
+            "k": k,
+            "distance_threshold": distance_threshold,
+            "members": 1,
+        })
+
+    def add_documents(self, documents: Iterable[Dict[str, Any]], batch_size: int = 100,
+                      total: Optional[int] = None) -> Dict[str, Any]:
+        """Adds chunk dicts ({"page_content", "metadata"}) to the vector store in batches.
+
+        Accepts any iterable, so callers can stream chunks from a generator
+        and peak memory stays at one batch rather than the whole corpus. Pass
+        `total` when known to get a bounded progress bar and totals in stats.
+        """
+        stats = {"successful": 0, "failed": 0,
+                 "skipped_duplicates": 0, "start_time": datetime.now().isoformat()}
+        if total is not None:
+            stats["total_documents"] = total
+
+        def flush(pending):
+            """Waits for a batch's embeddings and inserts it into Chroma."""
+            ids, texts, cleaned_metadatas, embedding_future = pending
             try:
-                texts = [doc.page_content for doc in batch]
-                ids = [doc.metadata.get("chunk_id", f"chunk_{i + j}") for j, doc in enumerate(batch)]
-                
-                # Clean metadata to ensure all values are basic types compatible with ChromaDB
-                cleaned_metadatas = []
-                for doc in batch:
-                    clean_meta = {}
-                    for key, value in doc.metadata.items():
-                        if isinstance(value, (str, int, float, bool, type(None))):
-                            clean_meta[key] = value
-                        else:
-                            clean_meta[key] = str(value)
-                    cleaned_metadatas.append(clean_meta)
-
-                self.vector_store.add_texts(texts=texts, metadatas=cleaned_metadatas, ids=ids)
-                stats["successful"] += len(batch)
+                # Embed the whole batch in one forward pass and hand the
+                # vectors straight to the collection
+                embeddings = embedding_future.result()
+                self.collection.add(
+                    ids=ids,
+                    documents=texts,
+                    embeddings=embeddings,
+                    metadatas=cleaned_metadatas
+                )
+                stats["successful"] += len(ids)
+                self._count += len(ids)
             except Exception as e:
-                print(f"Error processing batch starting at index {i}: {e}", file=sys.stderr)
-                stats["failed"] += len(batch)
+                print(f"Error processing batch of {len(ids)} documents: {e}", file=sys.stderr)
+                stats["failed"] += len(ids)
                 stats["last_error"] = str(e)
-        
+                # These IDs never made it in, so forget them again
+                self._known_ids.difference_update(ids)
+
+        # Double-buffered pipeline: while the worker thread embeds batch i,
+        # the main thread runs the (CPU+IO-bound) Chroma insert for batch i-1,
+        # overlapping the two dominant costs of indexing
+        doc_iter = iter(documents)
+        seen_any = False
+        # Coarse refreshes: with small batches over millions of chunks the
+        # default per-update redraw becomes measurable
+        progress = tqdm(total=total, desc="Indexing", unit="chunk", mininterval=1.0)
+        with ThreadPoolExecutor(max_workers=1) as embedder:
+            pending = None
+            while True:
+                batch = list(islice(doc_iter, batch_size))
+                if not batch:
+                    break
+                seen_any = True
+
+                # One pass over the batch: dedup on chunk ID (a SHA-256 of the
+                # content is far cheaper than the embedding forward pass that
+                # re-inserting would cost) while extracting ids, texts and
+                # metadata together instead of re-iterating per field
+                ids, texts, raw_metadatas = [], [], []
+                for doc in batch:
+                    text = doc["page_content"]
+                    metadata = doc["metadata"]
+                    chunk_id = metadata.get("chunk_id")
+                    if chunk_id is None:
+                        chunk_id = hashlib.sha256(text.encode()).hexdigest()[:32]
+                    if chunk_id in self._known_ids:
+                        stats["skipped_duplicates"] += 1
+                        continue
+                    self._known_ids.add(chunk_id)
+                    ids.append(chunk_id)
+                    texts.append(text)
+                    raw_metadatas.append(metadata)
+
+                if not ids:
+                    progress.update(len(batch))
+                    continue
+
+                # Clean metadata to ensure all values are basic types compatible with ChromaDB
+                cleaned_metadatas = _clean_metadatas(raw_metadatas)
+
+                embedding_future = embedder.submit(self.embedding_function.embed_documents, texts)
+                if pending is not None:
+                    flush(pending)
+                pending = (ids, texts, cleaned_metadatas, embedding_future)
+                progress.update(len(batch))
+
+            if pending is not None:
+                flush(pending)
+        progress.close()
+
+        if not seen_any:
+            return {"error": "No documents provided"}
+
+        # New documents can change what any query would return, so cached
+        # results from before this indexing run are no longer trustworthy
+        if stats["successful"]:
+            self._cache_keys = None
+            self._cache_entries.clear()
+            self._centroids.clear()
+            self._centroid_entries.clear()
+
         stats["end_time"] = datetime.now().isoformat()
-        stats["final_document_count"] = self.collection.count()
+        stats["final_document_count"] = self._count
         self._save_stats(stats)
         return stats
     
+    async def add_documents_async(self, documents: Iterable[Dict[str, Any]], batch_size: int = 100,
+                                  concurrency: int = 4) -> Dict[str, Any]:
+        """Indexes chunks against a remote Chroma server with offloaded embedding.
+
+        Embedding requests go to the persistent service at
+        settings.embedding_server_url (a text-embeddings-inference style
+        endpoint answering POST with {"inputs": [...]}) and inserts go to the
+        Chroma server at settings.chroma_server_host/port. Up to `concurrency`
+        batches are in flight at once, so network, GPU embedding and database
+        writes overlap instead of running serially in-process.
+        """
+        import aiohttp
+
+        if not settings.embedding_server_url:
+            raise ValueError("EMBEDDING_SERVER_URL must be set for async indexing")
+
+        client = await chromadb.AsyncHttpClient(
+            host=settings.chroma_server_host, port=settings.chroma_server_port
+        )
+        collection = await client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+        stats = {"successful": 0, "failed": 0, "start_time": datetime.now().isoformat()}
+
+        async def index_batch(session, batch):
+            ids, texts, raw_metadatas = [], [], []
+            for doc in batch:
+                text = doc["page_content"]
+                metadata = doc["metadata"]
+                chunk_id = metadata.get("chunk_id")
+                if chunk_id is None:
+                    chunk_id = hashlib.sha256(text.encode()).hexdigest()[:32]
+                ids.append(chunk_id)
+                texts.append(text)
+                raw_metadatas.append(metadata)
+            cleaned_metadatas = _clean_metadatas(raw_metadatas)
+            try:
+                async with session.post(settings.embedding_server_url,
+                                        json={"inputs": texts}) as response:
+                    response.raise_for_status()
+                    embeddings = await response.json()
+                await collection.add(
+                    ids=ids,
+                    documents=texts,
+                    embeddings=embeddings,
+                    metadatas=cleaned_metadatas
+                )
+                stats["successful"] += len(ids)
+            except Exception as e:
+                print(f"Error indexing batch of {len(ids)} documents: {e}", file=sys.stderr)
+                stats["failed"] += len(ids)
+                stats["last_error"] = str(e)
+
+        # N workers pull batches from one shared iterator, bounding both
+        # concurrency and the number of batches materialized at a time
+        doc_iter = iter(documents)
+        iter_lock = asyncio.Lock()
+
+        async def worker(session):
+            while True:
+                async with iter_lock:
+                    batch = list(islice(doc_iter, batch_size))
+                if not batch:
+                    return
+                await index_batch(session, batch)
+
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+
+        stats["end_time"] = datetime.now().isoformat()
+        self._save_stats(stats)
+        return stats
+
     def search_with_relevance(self, query: str, k: int = 5, distance_threshold: float = 0.5) -> List[Dict[str, Any]]:
         """
         Searches for documents and filters them by a distance threshold.
@@ -104,42 +506,125 @@ class VectorStoreManager:
         Returns:
             A list of formatted search results.
         """
-        if not self.vector_store:
+        if not self.collection:
             return []
-        
-        # similarity_search_with_score returns documents and their distance scores.
-        results_with_scores = self.vector_store.similarity_search_with_relevance_scores(query=query, k=k)
-        
+
+        # Embed once; the embedding doubles as the semantic-cache key and the
+        # search vector, so a cache miss does not pay a second model call
+        query_embedding = np.asarray(
+            self.embedding_function.embed_query(query), dtype=np.float32
+        )
+        cached = self._query_cache_lookup(query_embedding, k, distance_threshold)
+        if cached is not None:
+            return cached
+        cached = self._centroid_lookup(query_embedding, k, distance_threshold)
+        if cached is not None:
+            return cached
+
+        # Query the collection directly; going through a LangChain wrapper
+        # just re-wraps the same call and rebuilds Document objects per result
+        raw = self.collection.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        # The score is a distance, so a lower value is better; compare all
+        # scores at once with a NumPy mask instead of per-result Python checks
         formatted_results = []
-        for doc, score in results_with_scores:
-            # The score is a distance, so a lower value is better.
-            # We filter out results where the distance is too high.
-            if score <= distance_threshold:
-                formatted_results.append({
-                    "content": doc.page_content,
-                    "score": float(score),  # This is the distance score
-                    "metadata": doc.metadata,
-                    "headers": doc.metadata.get("headers", {}),
-                    "source": doc.metadata.get("source", "")
-                })
-        
+        docs = raw["documents"][0]
+        metadatas = raw["metadatas"][0]
+        distances = np.asarray(raw["distances"][0], dtype=np.float32)
+        if distances.size:
+            mask = distances <= distance_threshold
+            if mask.any():
+                for idx in np.flatnonzero(mask):
+                    metadata = metadatas[idx] or {}
+                    formatted_results.append({
+                        "content": docs[idx],
+                        "score": float(distances[idx]),  # This is the distance score
+                        "metadata": metadata,
+                        "headers": metadata.get("headers", {}),
+                        "section_path": metadata.get("section_path", ""),
+                        "source": metadata.get("source", "")
+                    })
+
+        self._query_cache_insert(query_embedding, k, distance_threshold, formatted_results)
+        self._centroid_update(query_embedding, k, distance_threshold, formatted_results)
         return formatted_results
+
+    def search_batch(self, queries: List[str], k: int = 5,
+                     distance_threshold: float = 0.5) -> List[List[Dict[str, Any]]]:
+        """
+        Searches for several queries with one multi-query Chroma call.
+
+        All queries are embedded in a single forward pass and submitted as one
+        query_embeddings batch, amortizing per-query HNSW setup and the
+        Python/Rust crossing over the whole batch.
+
+        Returns:
+            One result list per query, each shaped like search_with_relevance.
+        """
+        if not queries:
+            return []
+
+        embeddings = self.embedding_function.embed_documents(queries)
+        raw = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+
+        all_results = []
+        for docs, metadatas, distances in zip(raw["documents"], raw["metadatas"], raw["distances"]):
+            dist_arr = np.asarray(distances, dtype=np.float32)
+            row_results = []
+            for idx in np.flatnonzero(dist_arr <= distance_threshold):
+                metadata = metadatas[idx] or {}
+                row_results.append({
+                    "content": docs[idx],
+                    "score": float(dist_arr[idx]),
+                    "metadata": metadata,
+                    "headers": metadata.get("headers", {}),
+                    "section_path": metadata.get("section_path", ""),
+                    "source": metadata.get("source", "")
+                })
+            all_results.append(row_results)
+
+        return all_results
     
     def get_collection_info(self) -> Dict[str, Any]:
         """Gets information about the current collection."""
         return {
             "name": self.collection_name,
-            "count": self.collection.count(),
+            "count": self._count,
             "metadata": self.collection.metadata,
             "persist_directory": str(self.persist_directory)
         }
     
     def _save_stats(self, stats: Dict[str, Any]):
-        """Saves indexing statistics to a file."""
-        stats_file = self.persist_directory / "indexing_stats.json"
+        """Appends one line of indexing statistics to a JSONL file.
+
+        Appending is O(1) per run; the old JSON-array format re-read and
+        rewrote the full history on every indexing run.
+        """
+        stats_file = self.persist_directory / "indexing_stats.jsonl"
+        legacy_file = self.persist_directory / "indexing_stats.json"
         try:
-            existing_stats = json.loads(stats_file.read_text()) if stats_file.exists() else []
-            existing_stats.append(stats)
-            stats_file.write_text(json.dumps(existing_stats, indent=2))
+            # One-shot migration of the legacy JSON-array stats file; written
+            # to a temp file and os.replace()d so a crash mid-migration can
+            # never leave a truncated stats file behind
+            if legacy_file.exists() and not stats_file.exists():
+                tmp_file = stats_file.with_suffix(".jsonl.tmp")
+                with tmp_file.open("wb") as f:
+                    for entry in orjson.loads(legacy_file.read_bytes()):
+                        f.write(orjson.dumps(entry) + b"\n")
+                os.replace(tmp_file, stats_file)
+                legacy_file.unlink()
+
+            # orjson serializes straight to UTF-8 bytes in C, keeping the
+            # per-run stats write off the indexing critical path
+            with stats_file.open("ab") as f:
+                f.write(orjson.dumps(stats) + b"\n")
         except Exception as e:
             print(f"Could not save indexing stats: {e}", file=sys.stderr)
\ No newline at end of file